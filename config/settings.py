@@ -11,7 +11,10 @@ MODEL_OPTIONS = {
 
 # Content settings
 CONTENT_DIR = "confluence_content"
-CONTENT_FILE = "confluence_content.txt"
+SHARD_DIR = "shards"  # one shard file per space key inside CONTENT_DIR
+CONTENT_CACHE_CHUNKS = 128  # chunk texts kept in memory, least recently used evicted first
+CONTENT_CACHE_BYTES = 16 * 1024 * 1024  # total size of the cached chunk texts
+CHAT_HISTORY_FILE = "chat_history.txt"  # older chat turns are paged out here, inside CONTENT_DIR
 
 # Logging settings
 LOG_FILE = "network_requests.log"
@@ -19,4 +22,16 @@ JSON_LOG_FILE = "network_requests.json"
 
 # API settings
 API_TIMEOUT = 30  # seconds
-MAX_PAGES_PER_SPACE = 100 
\ No newline at end of file
+MAX_PAGES_PER_SPACE = 100
+
+# Retrieval settings
+SHARD_QUERY_WORKERS = 4  # shards queried in parallel
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_TOP_K = 5
+RERANK_BUDGET_MS = 500  # rerank shrinks k, or is skipped, to stay within this
+RERANK_MAX_PASSAGES = 16  # passages scored per candidate chunk
+
+# Chat settings
+CHAT_MAX_TURNS = 200  # turns kept in the chat view
+CHAT_CHUNK_SIZE = 400  # characters inserted per streaming step
+CHAT_CHUNK_DELAY_MS = 10  # delay between streaming steps
\ No newline at end of file
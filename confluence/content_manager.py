@@ -1,39 +1,76 @@
 from pathlib import Path
+from config.settings import CONTENT_DIR, SHARD_DIR
 import re
 
+RECORD_SEPARATOR = "\n\n---\n\n"
+DEFAULT_SHARD = "_default"
+
 class ContentManager:
     def __init__(self):
-        self.content_dir = Path("confluence_content")
+        self.content_dir = Path(CONTENT_DIR)
         self.content_dir.mkdir(exist_ok=True)
-        self.content_file = self.content_dir / "confluence_content.txt"
-    
-    def store_content(self, content, page_title=None, space_name=None, page_url=None):
+        # Each space gets its own shard file so it can be synced and loaded on its own
+        self.shard_dir = self.content_dir / SHARD_DIR
+        self.shard_dir.mkdir(exist_ok=True)
+        # space key -> (shard version, {chunk id: (offset, length)})
+        self.chunk_offsets = {}
+
+    def store_content(self, content, page_title=None, space_name=None, page_url=None,
+                      space_key=None, page_id=None):
         """Store content in a structured format for LLM processing."""
         try:
-            # Clean and structure the content
-            cleaned_content = self._clean_content(content)
-            
-            # Create metadata section
-            metadata = f"TITLE: {page_title or 'Untitled'}\n"
-            metadata += f"SPACE: {space_name or 'Not a space'}\n"
-            if page_url:
-                metadata += f"URL: {page_url}\n"
-            metadata += "---\n"
-            
-            # Create sections
-            sections = self._extract_sections(cleaned_content)
-            sections_text = "\n\n".join(sections)
-            
-            # Combine metadata and content
-            full_content = f"{metadata}\n{sections_text}\n\n---\n\n"
-            
-            # Append to file
-            with open(self.content_file, "a", encoding="utf-8") as f:
-                f.write(full_content)
-                
+            record = self._format_record(content, page_title, space_name, page_url, page_id)
+
+            if page_id and self._find_record(space_key, page_id) is not None:
+                # Replace the stale copy of this page, only this shard is rewritten
+                records = [existing for existing in self.load_shard(space_key)
+                           if self._record_id(existing) != str(page_id)]
+                records.append(record)
+                self._write_shard(space_key, records)
+            else:
+                # Append to the space's shard
+                with open(self._shard_file(space_key), "a", encoding="utf-8") as f:
+                    f.write(record + RECORD_SEPARATOR)
+
         except Exception as e:
             print(f"Error storing content: {str(e)}")
-    
+
+    def replace_shard(self, space_key, pages):
+        """Replace a space's shard with freshly fetched pages.
+
+        Each page is a dict with content, title, space_name, url and id keys.
+        """
+        try:
+            records = [self._format_record(page["content"], page.get("title"),
+                                           page.get("space_name"), page.get("url"),
+                                           page.get("id"))
+                       for page in pages]
+            self._write_shard(space_key, records)
+        except Exception as e:
+            print(f"Error storing content: {str(e)}")
+
+    def _format_record(self, content, page_title=None, space_name=None, page_url=None,
+                       page_id=None):
+        """Build the stored record for a single page."""
+        # Clean and structure the content
+        cleaned_content = self._clean_content(content)
+
+        # Create metadata section
+        metadata = f"TITLE: {page_title or 'Untitled'}\n"
+        metadata += f"SPACE: {space_name or 'Not a space'}\n"
+        if page_id:
+            metadata += f"ID: {page_id}\n"
+        if page_url:
+            metadata += f"URL: {page_url}\n"
+        metadata += "---\n"
+
+        # Create sections
+        sections = self._extract_sections(cleaned_content)
+        sections_text = "\n\n".join(sections)
+
+        # Combine metadata and content
+        return f"{metadata}\n{sections_text}"
+
     def _clean_content(self, content):
         """Clean the content for better LLM processing."""
         # Remove excessive whitespace
@@ -41,28 +78,150 @@ class ContentManager:
         # Remove special characters
         content = re.sub(r'[^\w\s.,;:!?()\-\'"]', ' ', content)
         return content.strip()
-    
+
     def _extract_sections(self, content):
         """Extract sections from content for better searchability."""
         sections = []
         # Split by common section markers
         parts = re.split(r'\n\s*(?:#{1,6}\s+|\d+\.\s+|[A-Z][^a-z]*:)', content)
-        
+
         for part in parts:
             if part.strip():
                 sections.append(part.strip())
-        
+
         return sections
-    
+
+    def shard_key(self, space_key):
+        """Normalize a space key to the name of its shard."""
+        # Keep the key usable as a file name
+        return re.sub(r'[^\w\-]', '_', space_key or DEFAULT_SHARD)
+
+    def _shard_file(self, space_key):
+        """Get the shard file for a space key."""
+        return self.shard_dir / f"{self.shard_key(space_key)}.txt"
+
+    def _write_shard(self, space_key, records):
+        """Rewrite a single shard from a list of records."""
+        shard_file = self._shard_file(space_key)
+        tmp_file = shard_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            f.write("".join(record + RECORD_SEPARATOR for record in records))
+        tmp_file.replace(shard_file)
+
+    def _record_id(self, record):
+        """Get the page id from a record's metadata, if any."""
+        match = re.search(r'^ID: (.+)$', record.split("\n---\n", 1)[0], re.MULTILINE)
+        return match.group(1).strip() if match else None
+
+    def _find_record(self, space_key, page_id):
+        """Find the record of a page within a shard."""
+        for record in self.load_shard(space_key):
+            if self._record_id(record) == str(page_id):
+                return record
+        return None
+
+    def list_shards(self):
+        """Get the space keys of all non-empty shards."""
+        return sorted(path.stem for path in self.shard_dir.glob("*.txt")
+                      if path.stat().st_size > 0)
+
+    def shard_version(self, space_key):
+        """Get a token that changes whenever a shard is rewritten."""
+        try:
+            stat = self._shard_file(space_key).stat()
+            return (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+    def load_shard(self, space_key):
+        """Load the page records stored in a space's shard."""
+        try:
+            with open(self._shard_file(space_key), "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return []
+        return [record for record in text.split(RECORD_SEPARATOR) if record.strip()]
+
+    def _index_shard(self, space_key):
+        """Get the byte offset of every chunk in a shard, rescanning only when it changed."""
+        version = self.shard_version(space_key)
+        cached = self.chunk_offsets.get(space_key)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        offsets = {}
+        separator = RECORD_SEPARATOR.encode("utf-8")
+        position = 0
+        position_index = 0
+
+        def add_record(raw):
+            if raw.strip():
+                # Records without a page id fall back to their position in the shard
+                header = raw.split(b"\n---\n", 1)[0].decode("utf-8", errors="ignore")
+                chunk_id = self._record_id(header) or f"#{position_index}"
+                offsets[chunk_id] = (position, len(raw))
+
+        try:
+            with open(self._shard_file(space_key), "rb") as f:
+                # Scan block by block so only the current record is held in memory
+                buffer = b""
+                for block in iter(lambda: f.read(65536), b""):
+                    buffer += block
+                    *records, buffer = buffer.split(separator)
+                    for raw in records:
+                        add_record(raw)
+                        position += len(raw) + len(separator)
+                        position_index += 1
+                add_record(buffer)
+        except FileNotFoundError:
+            pass
+        self.chunk_offsets[space_key] = (version, offsets)
+        return offsets
+
+    def chunk_ids(self, space_key):
+        """Get the ids of the chunks stored in a shard, without loading their text."""
+        return list(self._index_shard(space_key))
+
+    def load_chunk(self, space_key, chunk_id):
+        """Read a single chunk from its shard, or None if it is no longer there."""
+        location = self._index_shard(space_key).get(str(chunk_id))
+        if location is None:
+            return None
+        offset, length = location
+        with open(self._shard_file(space_key), "rb") as f:
+            f.seek(offset)
+            return f.read(length).decode("utf-8")
+
     def clear_content(self):
-        """Clear the content file."""
-        with open(self.content_file, "w", encoding="utf-8") as f:
-            f.write("")
-    
+        """Clear every shard."""
+        for shard_file in self.shard_dir.glob("*.txt"):
+            shard_file.unlink()
+
+    def prune_shards(self, space_keys):
+        """Delete every shard that does not belong to one of the given spaces."""
+        keep = {self.shard_key(space_key) for space_key in space_keys}
+        for shard_file in self.shard_dir.glob("*.txt"):
+            if shard_file.stem not in keep:
+                shard_file.unlink()
+
+    def resolve_shards(self, space_keys):
+        """Match space keys to stored shards, ignoring case.
+
+        Returns the matching shard names and the keys that matched nothing.
+        """
+        shards = {shard.lower(): shard for shard in self.list_shards()}
+        matched = []
+        unknown = []
+        for space_key in space_keys:
+            shard = shards.get(self.shard_key(space_key).lower())
+            if shard is None:
+                unknown.append(space_key)
+            elif shard not in matched:
+                matched.append(shard)
+        return matched, unknown
+
     def get_all_content(self):
         """Get all stored content."""
-        try:
-            with open(self.content_file, "r", encoding="utf-8") as f:
-                return f.read()
-        except FileNotFoundError:
-            return "" 
\ No newline at end of file
+        return "".join(record + RECORD_SEPARATOR
+                       for space_key in self.list_shards()
+                       for record in self.load_shard(space_key))
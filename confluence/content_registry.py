@@ -0,0 +1,45 @@
+from collections import OrderedDict
+import threading
+
+class ContentRegistry:
+    """Bounded LRU of chunk texts loaded on demand from the content store.
+
+    Bounded both by entry count and by total UTF-8 size, since a single
+    page record can be arbitrarily large.
+    """
+
+    def __init__(self, content_manager, max_chunks=128, max_bytes=16 * 1024 * 1024):
+        self.content_manager = content_manager
+        self.max_chunks = max_chunks
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        # (space key, chunk id, shard version) -> (text, size), least recently used first
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_text(self, space_key, chunk_id):
+        """Get a chunk's text, loading it from its shard on a cache miss."""
+        # Keying on the shard version lets texts from a rewritten shard age out
+        space_key = self.content_manager.shard_key(space_key)
+        key = (space_key, str(chunk_id), self.content_manager.shard_version(space_key))
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key][0]
+
+        text = self.content_manager.load_chunk(space_key, chunk_id)
+        if text is None:
+            return None
+
+        size = len(text.encode("utf-8"))
+        with self.lock:
+            if key not in self.cache:
+                self.cache[key] = (text, size)
+                self.total_bytes += size
+            self.cache.move_to_end(key)
+            # Always keep the newest entry, even if it alone is over the size bound
+            while len(self.cache) > 1 and (len(self.cache) > self.max_chunks
+                                           or self.total_bytes > self.max_bytes):
+                _, (_, evicted_size) = self.cache.popitem(last=False)
+                self.total_bytes -= evicted_size
+        return text
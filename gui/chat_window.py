@@ -1,11 +1,19 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+from pathlib import Path
 from utils.chat_text import ChatText
+from confluence.content_registry import ContentRegistry
+from config.settings import CONTENT_CACHE_CHUNKS, CONTENT_CACHE_BYTES, CONTENT_DIR, CHAT_HISTORY_FILE
 
 class ChatWindow:
-    def __init__(self, parent):
+    def __init__(self, parent, content_manager):
         self.parent = parent
-        self.content = []
+        self.content_manager = content_manager
+        # Texts are loaded on demand through a bounded LRU
+        self.registry = ContentRegistry(content_manager, CONTENT_CACHE_CHUNKS, CONTENT_CACHE_BYTES)
+        # Lightweight references to opened pages keyed by (shard, page id), never their text
+        self.opened_pages = {}
+        self.question_handler = None
         self.setup_gui()
     
     def setup_gui(self):
@@ -14,9 +22,24 @@ class ChatWindow:
         chat_frame.pack(fill="both", expand=True, padx=5, pady=5)
         
         # Chat history
-        self.chat_history = ChatText(chat_frame, wrap=tk.WORD)
+        # Turns beyond the cap are paged out to disk to keep rendering cost flat
+        self.chat_history = ChatText(chat_frame, wrap=tk.WORD,
+                                     history_file=Path(CONTENT_DIR) / CHAT_HISTORY_FILE)
         self.chat_history.pack(fill="both", expand=True, padx=5, pady=5)
         
+        # Space filter frame
+        filter_frame = ttk.Frame(chat_frame)
+        filter_frame.pack(fill="x", padx=5, pady=5)
+        
+        ttk.Label(filter_frame, text="Spaces (optional):").pack(side="left", padx=5)
+        self.space_filter_entry = ttk.Entry(filter_frame)
+        self.space_filter_entry.pack(side="left", fill="x", expand=True, padx=5)
+        
+        # Restrict answers to the pages opened in this session
+        self.opened_only_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(filter_frame, text="Opened pages only", 
+                        variable=self.opened_only_var).pack(side="right", padx=5)
+        
         # Question input frame
         question_frame = ttk.Frame(chat_frame)
         question_frame.pack(fill="x", padx=5, pady=5)
@@ -31,8 +54,27 @@ class ChatWindow:
         # Bind Enter key to ask question
         self.question_entry.bind('<Return>', lambda e: self.ask_question())
     
-    def update_content(self, new_content):
-        self.content.append(new_content)
+    def update_content(self, space_key, page_id):
+        shard = self.content_manager.shard_key(space_key)
+        self.opened_pages[(shard, str(page_id))] = {
+            "space_key": shard,
+            "page_id": str(page_id),
+            "chunk_ids": [str(page_id)],
+        }
+    
+    def get_opened_chunks(self):
+        # (shard, chunk id) pairs of the opened pages, resolved to text by the registry
+        return {(ref["space_key"], chunk_id)
+                for ref in self.opened_pages.values()
+                for chunk_id in ref["chunk_ids"]}
+    
+    def set_question_handler(self, handler):
+        self.question_handler = handler
+    
+    def get_space_filter(self):
+        # Comma separated space keys, empty means every space
+        keys = [key.strip() for key in self.space_filter_entry.get().split(",") if key.strip()]
+        return list(dict.fromkeys(keys)) or None
     
     def ask_question(self):
         question = self.question_entry.get().strip()
@@ -40,23 +82,39 @@ class ChatWindow:
             messagebox.showwarning("Warning", "Please enter a question.")
             return
         
-        if not self.content:
+        if not self.content_manager.list_shards():
             messagebox.showwarning("Warning", "Please fetch some content first.")
             return
         
+        chunk_ids = None
+        if self.opened_only_var.get():
+            if not self.opened_pages:
+                messagebox.showwarning("Warning", "Please open a page first.")
+                return
+            chunk_ids = self.get_opened_chunks()
+        
+        space_keys = self.get_space_filter()
+        if space_keys:
+            space_keys, unknown = self.content_manager.resolve_shards(space_keys)
+            if unknown:
+                messagebox.showwarning("Warning", f"No content found for spaces: {', '.join(unknown)}")
+            if not space_keys:
+                return
+        
         # Add question to chat
-        self.chat_history.insert(tk.END, f"\nYou: {question}\n\n", "question")
+        self.chat_history.insert_plain(f"\nYou: {question}\n", "question")
         
         # Process question and get answer
-        answer = self.process_question(question)
+        answer = self.process_question(question, space_keys, chunk_ids)
         
-        # Add answer to chat
-        self.chat_history.insert(tk.END, f"{answer}\n\n", "answer")
-        self.chat_history.see(tk.END)
+        # Add answer to chat, streamed in chunks
+        self.chat_history.insert_markdown(f"{answer}\n", "answer")
         
         # Clear question entry
         self.question_entry.delete(0, tk.END)
     
-    def process_question(self, question):
-        # This method will be implemented by the model selection component
-        return "Answer processing will be handled by the selected model." 
\ No newline at end of file
+    def process_question(self, question, space_keys=None, chunk_ids=None):
+        # The model selection component registers itself as the question handler
+        if self.question_handler is None:
+            return "Answer processing will be handled by the selected model."
+        return self.question_handler(question, space_keys, chunk_ids) 
\ No newline at end of file
@@ -28,6 +28,7 @@ class MainWindow:
         self.setup_gui()
         
         # Load saved credentials if they exist
+        self.saved_credentials = {}
         self.load_credentials()
     
     def setup_gui(self):
@@ -50,7 +51,7 @@ class MainWindow:
         self.setup_content_frame(left_panel)
         
         # Setup chat and model selection
-        self.chat_window = ChatWindow(right_panel)
+        self.chat_window = ChatWindow(right_panel, self.content_manager)
         self.model_selection = ModelSelection(right_panel, self.chat_window)
     
     def setup_connection_frame(self, parent):
@@ -111,6 +112,7 @@ class MainWindow:
         try:
             with open("credentials.json", "r") as f:
                 credentials = json.load(f)
+                self.saved_credentials = credentials
                 logging.info("Loading saved credentials")
                 self.url_entry.insert(0, credentials.get("url", ""))
                 self.username_entry.insert(0, credentials.get("username", ""))
@@ -146,8 +148,11 @@ class MainWindow:
             for item in self.tree.get_children():
                 self.tree.delete(item)
             
-            # Clear existing content
-            self.content_manager.clear_content()
+            # Content synced from another instance or account must not be queried
+            if (self.saved_credentials.get("url") != url
+                    or self.saved_credentials.get("username") != username):
+                logging.info("Connection changed, clearing stored content")
+                self.content_manager.clear_content()
             
             # If space_id is provided, only fetch data from that space
             if space_id:
@@ -160,12 +165,7 @@ class MainWindow:
                         self.tree.insert(space_item, "end", values=("Loading...", "", ""))
                         
                         # Fetch and save all pages in this space
-                        pages = self.confluence_client.get_pages(space["key"])
-                        for page in pages:
-                            # Save page content
-                            content = self.confluence_client.get_page_content(page["id"])
-                            page_url = f"{url}/pages/viewpage.action?pageId={page['id']}"
-                            self.content_manager.store_content(content, page["title"], space["name"], page_url)
+                        self.sync_space(space, url)
                 except Exception as e:
                     logging.error(f"Error fetching data for space {space_id}: {str(e)}")
                     messagebox.showerror("Error", f"Error fetching data for space {space_id}: {str(e)}")
@@ -180,24 +180,23 @@ class MainWindow:
                     
                     # Fetch and save all pages in this space
                     try:
-                        pages = self.confluence_client.get_pages(space["key"])
-                        for page in pages:
-                            # Save page content
-                            content = self.confluence_client.get_page_content(page["id"])
-                            page_url = f"{url}/pages/viewpage.action?pageId={page['id']}"
-                            self.content_manager.store_content(content, page["title"], space["name"], page_url)
+                        self.sync_space(space, url)
                     except Exception as e:
                         logging.error(f"Error fetching pages for space {space['name']}: {str(e)}")
+                
+                # Drop shards of spaces that were deleted or are no longer visible
+                self.content_manager.prune_shards([space["key"] for space in spaces])
             
             # Save credentials
             logging.info("Saving credentials")
+            self.saved_credentials = {
+                "url": url,
+                "username": username,
+                "api_token": api_token,
+                "space_id": space_id
+            }
             with open("credentials.json", "w") as f:
-                json.dump({
-                    "url": url,
-                    "username": username,
-                    "api_token": api_token,
-                    "space_id": space_id
-                }, f)
+                json.dump(self.saved_credentials, f)
             logging.info("Credentials saved successfully")
             
             messagebox.showinfo("Success", "Connected to Confluence successfully!")
@@ -206,6 +205,18 @@ class MainWindow:
             logging.error(f"Failed to connect: {str(e)}")
             messagebox.showerror("Error", f"Failed to connect: {str(e)}")
     
+    def sync_space(self, space, url):
+        # Rebuild only this space's shard, other spaces are left untouched
+        pages = self.confluence_client.get_pages(space["key"])
+        records = []
+        for page in pages:
+            # Save page content
+            content = self.confluence_client.get_page_content(page["id"])
+            page_url = f"{url}/pages/viewpage.action?pageId={page['id']}"
+            records.append({"content": content, "title": page["title"],
+                            "space_name": space["name"], "url": page_url, "id": page["id"]})
+        self.content_manager.replace_shard(space["key"], records)
+    
     def on_item_double_click(self, event):
         # Check if there's a selected item
         selected_items = self.tree.selection()
@@ -247,11 +258,13 @@ class MainWindow:
         # Fetch and display the page content
         content = self.confluence_client.get_page_content(page_id)
         
-        # Get the space name
+        # Get the space name and key
         space_name = "Unknown Space"
+        space_key = None
         parent_item = self.tree.parent(self.tree.selection()[0])
         if parent_item:
             space_name = self.tree.item(parent_item, "values")[0]
+            space_key = self.tree.item(parent_item, "values")[2]
         
         # Get the page URL
         url = self.url_entry.get().strip()
@@ -261,10 +274,10 @@ class MainWindow:
             url = url[:-1]
         page_url = f"{url}/pages/viewpage.action?pageId={page_id}"
         
-        # Clear existing content and store new content
-        self.content_manager.clear_content()
-        self.content_manager.store_content(content, page_title, space_name, page_url)
-        self.chat_window.update_content(content)
+        # Store new content, replacing any older copy in the space's shard
+        self.content_manager.store_content(content, page_title, space_name, page_url,
+                                           space_key, page_id)
+        self.chat_window.update_content(space_key, page_id)
         
         # Display content in the new window
         text_widget.insert(tk.END, content)
@@ -3,12 +3,19 @@ from tkinter import ttk, messagebox
 from models.mpnet_model import MPNetModel
 from models.minilm_model import MiniLMModel
 from models.bedrock_model import BedrockModel
+from models.shard_index import ShardIndex
+from models.reranker import CrossEncoderReranker
+from config.settings import RERANK_TOP_K, RERANK_BUDGET_MS
+import time
 
 class ModelSelection:
     def __init__(self, parent, chat_window):
         self.parent = parent
         self.chat_window = chat_window
         self.model = None
+        self.index = None
+        self.reranker = None
+        self.chat_window.set_question_handler(self.process_question)
         self.setup_gui()
     
     def setup_gui(self):
@@ -24,6 +31,20 @@ class ModelSelection:
         ttk.Radiobutton(model_frame, text="AWS Bedrock (Titan Embed)", 
                        variable=self.model_var, value="Bedrock").pack(anchor="w")
         
+        # Optional second retrieval stage
+        self.rerank_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(model_frame, text="Rerank top results (cross-encoder)", 
+                        variable=self.rerank_var, command=self.load_reranker).pack(anchor="w")
+        
+        rerank_frame = ttk.Frame(model_frame)
+        rerank_frame.pack(fill="x")
+        ttk.Label(rerank_frame, text="Top-k:").pack(side="left", padx=5)
+        self.top_k_var = tk.StringVar(value=str(RERANK_TOP_K))
+        ttk.Entry(rerank_frame, textvariable=self.top_k_var, width=5).pack(side="left")
+        ttk.Label(rerank_frame, text="Latency budget (ms):").pack(side="left", padx=5)
+        self.budget_var = tk.StringVar(value=str(RERANK_BUDGET_MS))
+        ttk.Entry(rerank_frame, textvariable=self.budget_var, width=7).pack(side="left")
+        
         ttk.Button(model_frame, text="Load Model", 
                   command=self.load_selected_model).pack(pady=5)
     
@@ -35,38 +56,82 @@ class ModelSelection:
                 self.model = MiniLMModel()
             else:  # Bedrock
                 self.model = BedrockModel()
+            self.index = ShardIndex(self.model, self.chat_window.content_manager,
+                                    self.chat_window.registry)
+            self.load_reranker()
             messagebox.showinfo("Success", f"Loaded {self.model.get_model_name()} model successfully!")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load model: {str(e)}")
     
-    def process_question(self, question, content):
+    def load_reranker(self):
+        # Load the cross-encoder up front so answering never waits for it
+        if not self.rerank_var.get() or self.reranker is not None:
+            return
+        try:
+            self.reranker = CrossEncoderReranker()
+        except Exception as e:
+            self.rerank_var.set(False)
+            messagebox.showerror("Error", f"Failed to load reranker: {str(e)}")
+    
+    def get_rerank_settings(self):
+        try:
+            top_k = max(1, int(self.top_k_var.get()))
+        except ValueError:
+            top_k = RERANK_TOP_K
+        try:
+            budget = max(0.0, float(self.budget_var.get())) / 1000
+        except ValueError:
+            budget = RERANK_BUDGET_MS / 1000
+        return top_k, budget
+    
+    def format_timings(self, timings):
+        return "Timings: " + ", ".join(f"{stage} {value}" for stage, value in timings)
+    
+    def process_question(self, question, space_keys=None, chunk_ids=None):
         if self.model is None:
             messagebox.showwarning("Warning", "Please select and load a model first.")
             return "No model loaded."
         
         try:
-            # Encode the question
-            question_embedding = self.model.encode(question, convert_to_tensor=True)
+            rerank = self.rerank_var.get()
+            top_k, budget = self.get_rerank_settings()
+            timings = []
             
-            # Find the most relevant content
-            best_match = None
-            best_score = -1
-            
-            for chunk in content:
-                content_embedding = self.model.encode(chunk, convert_to_tensor=True)
-                similarity = self.model.get_similarity(question_embedding, content_embedding)
-                score = similarity.item()
-                
-                if score > best_score:
-                    best_score = score
-                    best_match = chunk
+            # Stage 1: fan out across the selected shards with the bi-encoder
+            start = time.perf_counter()
+            hits = self.index.query(question, space_keys, top_k=top_k if rerank else 1,
+                                    chunk_ids=chunk_ids)
+            retrieve_seconds = time.perf_counter() - start
+            timings.append(("retrieve", f"{retrieve_seconds * 1000:.1f} ms"))
             
-            if best_match:
-                # Format the response with confidence score
-                confidence = best_score * 100
-                return self.model.format_response(best_match, confidence)
-            else:
+            if not hits:
                 return "No relevant content found."
+            
+            best_score, _, best_match = hits[0]
+            # Format the response with confidence score
+            confidence = best_score * 100
+            
+            # Stage 2: rerank what the remaining budget allows
+            if rerank and self.reranker is None:
+                timings.append(("rerank", "unavailable"))
+            elif rerank:
+                try:
+                    rerank_start = time.perf_counter()
+                    result = self.reranker.rerank(question, [chunk for _, _, chunk in hits],
+                                                  deadline=start + budget)
+                    rerank_ms = (time.perf_counter() - rerank_start) * 1000
+                    if result:
+                        score, passage, header, scored = result
+                        best_match = f"{header}\n---\n\n{passage}" if header else passage
+                        confidence = score * 100
+                        timings.append(("rerank", f"{rerank_ms:.1f} ms (k={scored})"))
+                    else:
+                        timings.append(("rerank", "skipped (over budget)"))
+                except Exception as e:
+                    # Keep the stage 1 answer
+                    timings.append(("rerank", f"failed ({str(e)})"))
+            
+            return self.model.format_response(best_match, confidence) + "\n" + self.format_timings(timings)
                 
         except Exception as e:
             return f"Error processing question: {str(e)}" 
\ No newline at end of file
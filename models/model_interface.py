@@ -16,7 +16,7 @@ class ModelInterface(ABC):
         return self.model.encode(text, convert_to_tensor=convert_to_tensor)
     
     def get_similarity(self, embedding1, embedding2):
-        return torch.nn.functional.cosine_similarity(embedding1, embedding2)
+        return torch.nn.functional.cosine_similarity(embedding1, embedding2, dim=-1)
     
     def format_response(self, content, confidence):
         return f"Answer (Confidence: {confidence:.2f}%):\n{content}" 
\ No newline at end of file
@@ -0,0 +1,92 @@
+from sentence_transformers import CrossEncoder
+from config.settings import RERANK_MODEL, RERANK_MAX_PASSAGES
+import torch
+import re
+import time
+
+class CrossEncoderReranker:
+    """Second retrieval stage scoring (question, passage) pairs with a cross-encoder."""
+
+    def __init__(self, model_name=RERANK_MODEL, sentences_per_passage=3,
+                 max_passages=RERANK_MAX_PASSAGES):
+        self.model = CrossEncoder(model_name)
+        self.sentences_per_passage = sentences_per_passage
+        # Passages scored per candidate chunk, so one long page cannot eat the budget
+        self.max_passages = max_passages
+        # Running estimate of the time needed to score one passage
+        self.seconds_per_passage = None
+        # Run once up front so the cold first call does not skew the estimate
+        self.score([("warm up", "warm up")])
+
+    def affordable_passages(self, remaining_seconds):
+        """Number of passages expected to fit in the remaining budget, None if unknown."""
+        if remaining_seconds <= 0:
+            return 0
+        if self.seconds_per_passage is None:
+            # Nothing measured yet, try and learn from it
+            return None
+        passages = int(remaining_seconds / self.seconds_per_passage)
+        if passages == 0:
+            # Skips record no timings, decay the estimate so a later query probes again
+            self.seconds_per_passage *= 0.8
+        return passages
+
+    def score(self, pairs):
+        # The model outputs relevance logits, squash them into [0, 1]
+        return self.model.predict(pairs, activation_fct=torch.nn.Sigmoid())
+
+    def split_passages(self, chunk):
+        """Split a stored record into its metadata header and sentence-window passages."""
+        header, _, body = chunk.partition("\n---\n")
+        if not body:
+            header, body = "", chunk
+        sentences = [s for s in re.split(r'(?<=[.!?])\s+', body.strip()) if s]
+        step = self.sentences_per_passage
+        passages = [" ".join(sentences[i:i + step]) for i in range(0, len(sentences), step)]
+        return header, passages or [body.strip()]
+
+    def rerank(self, question, chunks, deadline=None):
+        """Find the best passage within the candidate chunks.
+
+        Candidates are scored in order, each capped to max_passages passages,
+        until the passages expected to fit before the deadline (a
+        time.perf_counter() value) are used up. Returns (score, passage,
+        header, candidates_scored) with the score in [0, 1], or None if the
+        budget did not allow scoring anything.
+        """
+        budget = None
+        if deadline is not None:
+            budget = self.affordable_passages(deadline - time.perf_counter())
+            if budget == 0:
+                return None
+
+        best = None
+        scored = 0
+        for chunk in chunks:
+            if budget is not None and budget <= 0:
+                break
+            if deadline is not None and scored and time.perf_counter() >= deadline:
+                break
+            header, passages = self.split_passages(chunk)
+            passages = passages[:self.max_passages]
+            if budget is not None:
+                passages = passages[:budget]
+                budget -= len(passages)
+
+            start = time.perf_counter()
+            scores = self.score([(question, passage) for passage in passages])
+            self._record_timing((time.perf_counter() - start) / len(passages))
+            for score, passage in zip(scores, passages):
+                if best is None or float(score) > best[0]:
+                    best = (float(score), passage, header)
+            scored += 1
+
+        if best is None:
+            return None
+        return best + (scored,)
+
+    def _record_timing(self, seconds):
+        if self.seconds_per_passage is None:
+            self.seconds_per_passage = seconds
+        else:
+            self.seconds_per_passage = 0.8 * self.seconds_per_passage + 0.2 * seconds
@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import SHARD_QUERY_WORKERS
+import heapq
+import threading
+import torch
+
+class ShardIndex:
+    """Embedding index split into one shard per Confluence space."""
+
+    def __init__(self, model, content_manager, registry, max_workers=SHARD_QUERY_WORKERS):
+        self.model = model
+        self.content_manager = content_manager
+        # Chunk texts are only kept in the bounded registry, never in the index
+        self.registry = registry
+        self.max_workers = max_workers
+        # space key -> (shard version, chunk ids, stacked embeddings or None)
+        self.shards = {}
+        self.lock = threading.Lock()
+
+    def build_shard(self, space_key):
+        """Encode every chunk of a shard and keep only ids and one embedding matrix in memory."""
+        version = self.content_manager.shard_version(space_key)
+        chunk_ids = []
+        embeddings = []
+        for chunk_id in self.content_manager.chunk_ids(space_key):
+            # Read one chunk at a time so only one chunk's text is held
+            chunk = self.content_manager.load_chunk(space_key, chunk_id)
+            if chunk is None:
+                continue
+            chunk_ids.append(chunk_id)
+            embeddings.append(self.model.encode(chunk, convert_to_tensor=True))
+        # Stacked so a whole shard is scored in a single call
+        embeddings = torch.stack(embeddings) if embeddings else None
+        with self.lock:
+            self.shards[space_key] = (version, chunk_ids, embeddings)
+        return chunk_ids, embeddings
+
+    def load_shard(self, space_key):
+        """Get a shard's chunk ids and embeddings, rebuilding it only if it changed on disk."""
+        with self.lock:
+            cached = self.shards.get(space_key)
+        if cached and cached[0] == self.content_manager.shard_version(space_key):
+            return cached[1], cached[2]
+        return self.build_shard(space_key)
+
+    def query(self, question, space_keys=None, top_k=1, chunk_ids=None):
+        """Find the top-k chunks for a question across the selected shards.
+
+        chunk_ids optionally restricts the search to a set of (shard, chunk id)
+        pairs. Returns a list of (score, space_key, chunk) tuples, best first.
+        """
+        if space_keys is None:
+            space_keys = self.content_manager.list_shards()
+        # Query each shard once, even if the filter repeats a key or names it differently
+        space_keys = list(dict.fromkeys(self.content_manager.shard_key(key) for key in space_keys))
+        if chunk_ids is not None:
+            # Skip shards that hold none of the allowed chunks
+            shards = {shard for shard, _ in chunk_ids}
+            space_keys = [key for key in space_keys if key in shards]
+        if not space_keys:
+            return []
+
+        question_embedding = self.model.encode(question, convert_to_tensor=True)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(space_keys))) as executor:
+            shard_results = executor.map(
+                lambda space_key: self._query_shard(space_key, question_embedding, top_k, chunk_ids),
+                space_keys)
+            best = heapq.nlargest(top_k, (hit for hits in shard_results for hit in hits),
+                                  key=lambda hit: hit[0])
+
+        # Only the merged top-k texts are loaded
+        results = []
+        for score, space_key, chunk_id in best:
+            chunk = self.registry.get_text(space_key, chunk_id)
+            if chunk is not None:
+                results.append((score, space_key, chunk))
+        return results
+
+    def _query_shard(self, space_key, question_embedding, top_k, allowed=None):
+        """Score a single shard and keep its local top-k."""
+        chunk_ids, embeddings = self.load_shard(space_key)
+        if embeddings is None:
+            return []
+        if allowed is not None:
+            positions = [i for i, chunk_id in enumerate(chunk_ids) if (space_key, chunk_id) in allowed]
+            if not positions:
+                return []
+            chunk_ids = [chunk_ids[i] for i in positions]
+            embeddings = embeddings[positions]
+        # One vectorized call per shard, torch releases the GIL so shards score in parallel
+        question_embedding = question_embedding.to(embeddings.device, embeddings.dtype)
+        similarities = torch.nn.functional.cosine_similarity(
+            question_embedding.unsqueeze(0), embeddings, dim=-1)
+        scores, indices = torch.topk(similarities, min(top_k, len(chunk_ids)))
+        return [(score, space_key, chunk_ids[index])
+                for score, index in zip(scores.tolist(), indices.tolist())]
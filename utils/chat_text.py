@@ -1,30 +1,189 @@
 import tkinter as tk
 from tkinter import scrolledtext
-import markdown
 from tkinter.font import Font
+from collections import deque
+from config.settings import CHAT_MAX_TURNS, CHAT_CHUNK_SIZE, CHAT_CHUNK_DELAY_MS
+import re
+
+# Inline markdown: bold, inline code and italic
+INLINE_PATTERN = re.compile(r'(\*\*[^*]+\*\*|`[^`]+`|\*[^*\s][^*]*\*)')
+HEADING_PATTERN = re.compile(r'(#{1,6})\s+(.*)')
+BULLET_PATTERN = re.compile(r'\s*[-*+]\s+(.*)')
+NUMBERED_PATTERN = re.compile(r'\s*(\d+[.)])\s+(.*)')
+RULE_PATTERN = re.compile(r'\s*([-*_])(\s*\1){2,}\s*')
 
 class ChatText(scrolledtext.ScrolledText):
-    def __init__(self, master=None, **kwargs):
+    def __init__(self, master=None, history_file=None, max_turns=CHAT_MAX_TURNS,
+                 chunk_size=CHAT_CHUNK_SIZE, chunk_delay=CHAT_CHUNK_DELAY_MS, **kwargs):
         super().__init__(master, **kwargs)
-        
-        # Configure tags for different message types
-        self.tag_configure("question", foreground="blue")
-        self.tag_configure("answer", foreground="black")
-        
+
+        # Older turns beyond max_turns are paged out to history_file
+        self.history_file = history_file
+        self.max_turns = max_turns
+        self.paged_turns = 0
+        self.turn_count = 0
+        self.turn_marks = []
+
+        # Pending (text, tags) segments, inserted chunk_size characters every chunk_delay ms
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.pending = deque()
+        self.streaming = False
+
         # Configure font
         self.font = Font(family="Helvetica", size=12)
         self.configure(font=self.font)
-    
+        bold_font = Font(family="Helvetica", size=12, weight="bold")
+        italic_font = Font(family="Helvetica", size=12, slant="italic")
+        code_font = Font(family="Courier", size=11)
+        heading_fonts = [Font(family="Helvetica", size=size, weight="bold") for size in (18, 16, 14)]
+
+        # Configure tags for different message types
+        self.tag_configure("question", foreground="blue")
+        self.tag_configure("answer", foreground="black")
+        self.tag_configure("notice", foreground="gray")
+
+        # Configure tags for markdown formatting
+        self.tag_configure("bold", font=bold_font)
+        self.tag_configure("italic", font=italic_font)
+        self.tag_configure("code", font=code_font, background="#f0f0f0")
+        self.tag_configure("code_block", font=code_font, background="#f0f0f0", lmargin1=10, lmargin2=10)
+        self.tag_configure("bullet", lmargin1=10, lmargin2=25)
+        self.tag_configure("rule", foreground="gray")
+        # Tags configured later take priority, so headings keep their size over inline spans
+        for level, heading_font in enumerate(heading_fonts, start=1):
+            self.tag_configure(f"h{level}", font=heading_font)
+
+        # Keep the font objects alive as long as the widget
+        self.tag_fonts = [bold_font, italic_font, code_font] + heading_fonts
+
     def insert_markdown(self, text, tag=None):
         """Insert text with markdown formatting."""
-        # Convert markdown to HTML
-        html = markdown.markdown(text)
-        
-        # Insert the text
-        self.insert(tk.END, html, tag)
-        
-        # Add newline
-        self.insert(tk.END, "\n")
-        
-        # Scroll to the bottom
-        self.see(tk.END) 
\ No newline at end of file
+        self.queue_turn(self.parse_markdown(text, tag))
+
+    def insert_plain(self, text, tag=None):
+        """Insert text as is, without markdown formatting."""
+        self.queue_turn([(text + "\n", (tag,) if tag else ())])
+
+    def parse_markdown(self, text, tag=None):
+        """Convert markdown into (text, tags) segments for the Tk text tags."""
+        base = (tag,) if tag else ()
+        segments = []
+        in_code_block = False
+
+        for line in text.split("\n"):
+            if line.strip().startswith("```"):
+                in_code_block = not in_code_block
+                continue
+            if in_code_block:
+                segments.append((line + "\n", base + ("code_block",)))
+                continue
+
+            heading = HEADING_PATTERN.match(line)
+            bullet = BULLET_PATTERN.match(line)
+            numbered = NUMBERED_PATTERN.match(line)
+            if heading:
+                level = min(len(heading.group(1)), 3)
+                segments.extend(self.parse_inline(heading.group(2), base + (f"h{level}",)))
+            elif RULE_PATTERN.fullmatch(line):
+                segments.append(("─" * 20, base + ("rule",)))
+            elif bullet:
+                segments.append(("• ", base + ("bullet",)))
+                segments.extend(self.parse_inline(bullet.group(1), base + ("bullet",)))
+            elif numbered:
+                segments.append((numbered.group(1) + " ", base + ("bullet",)))
+                segments.extend(self.parse_inline(numbered.group(2), base + ("bullet",)))
+            else:
+                segments.extend(self.parse_inline(line, base))
+            segments.append(("\n", base))
+
+        return segments
+
+    def parse_inline(self, text, tags):
+        """Split a line into segments for bold, italic and inline code spans."""
+        segments = []
+        for part in INLINE_PATTERN.split(text):
+            if not part:
+                continue
+            if part.startswith("**") and part.endswith("**") and len(part) > 4:
+                segments.append((part[2:-2], tags + ("bold",)))
+            elif part.startswith("`") and part.endswith("`") and len(part) > 2:
+                segments.append((part[1:-1], tags + ("code",)))
+            elif part.startswith("*") and part.endswith("*") and len(part) > 2:
+                segments.append((part[1:-1], tags + ("italic",)))
+            else:
+                segments.append((part, tags))
+        return segments
+
+    def queue_turn(self, segments):
+        """Queue a turn's segments and start streaming them if idle."""
+        # None marks where a new turn starts
+        self.pending.append(None)
+        self.pending.extend(segments)
+        if not self.streaming:
+            self.streaming = True
+            self.after(0, self.insert_next_chunk)
+
+    def insert_next_chunk(self):
+        """Insert up to chunk_size characters, then reschedule for the rest."""
+        at_bottom = self.yview()[1] >= 1.0
+        budget = self.chunk_size
+
+        while self.pending and budget > 0:
+            segment = self.pending.popleft()
+            if segment is None:
+                self.start_turn()
+                continue
+            text, tags = segment
+            if len(text) > budget:
+                # Keep the rest of a long segment for the next chunk
+                self.pending.appendleft((text[budget:], tags))
+                text = text[:budget]
+            self.insert(tk.END, text, tags)
+            budget -= len(text)
+
+        # Only follow the output if the user has not scrolled up
+        if at_bottom:
+            self.see(tk.END)
+
+        if self.pending:
+            self.after(self.chunk_delay, self.insert_next_chunk)
+        else:
+            self.streaming = False
+
+    def start_turn(self):
+        """Mark where a turn starts and page out the oldest turns over the cap."""
+        mark = f"turn{self.turn_count}"
+        self.turn_count += 1
+        self.mark_set(mark, "end-1c")
+        self.mark_gravity(mark, tk.LEFT)
+        self.turn_marks.append(mark)
+
+        while len(self.turn_marks) > self.max_turns:
+            self.page_out_turn()
+
+    def page_out_turn(self):
+        """Move the oldest turn out of the widget and into the history file."""
+        # Drop the previous notice so it is not paged out with the turn
+        if "notice" in self.tag_names("1.0"):
+            self.delete("1.0", "2.0")
+
+        mark = self.turn_marks.pop(0)
+        end = self.turn_marks[0] if self.turn_marks else "end-1c"
+
+        if self.history_file:
+            # The file starts fresh with each session
+            mode = "a" if self.paged_turns else "w"
+            with open(self.history_file, mode, encoding="utf-8") as f:
+                f.write(self.get(mark, end))
+
+        self.delete(mark, end)
+        self.mark_unset(mark)
+        self.paged_turns += 1
+
+        # Keep a single notice line at the top
+        notice = f"[{self.paged_turns} earlier messages"
+        if self.history_file:
+            notice += f" saved to {self.history_file}"
+        notice += "]\n"
+        self.insert("1.0", notice, "notice")